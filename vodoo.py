@@ -20,30 +20,22 @@ __company__ = "ME&ONLYME"
 
 import sys
 import os
+import io
+import re
+import base64
+import hashlib
+import configparser
 from os.path import expandvars, expanduser, abspath, realpath
 
 import time
-from datetime import datetime, timedelta
+import signal
+import functools
+import collections
+import queue
+import threading
 
-import logging
 from urllib.parse import urljoin
 
-logging.basicConfig()
-
-_logger = logging.getLogger(__name__)
-
-try:
-    import passlib.context
-except ImportError:
-    _logger.warning("Please install passlib package with 'pip install passlib'")
-    passlib = None
-
-try:
-    import requests
-except ImportError:
-    _logger.warning("Please install requests package with 'pip install requests'")
-    requests = None
-
 
 class Colors:
     HEADER = '\033[95m'
@@ -56,17 +48,16 @@ class Colors:
     ENDC = '\033[0m'
 
 
-def log(s, color=None):
-    try:
-        if color:
-            sys.stdout.write(color)
-
-        sys.stdout.write(s)
+# INFO: output is flushed on every log() only on a terminal or when asked with flush=True;
+#       otherwise pipes/files rely on stdout buffering.
+STDOUT_TTY = sys.stdout.isatty()
 
-        if color:
-            sys.stdout.write(Colors.ENDC)
 
-        sys.stdout.flush()
+def log(s, color=None, flush=False):
+    try:
+        sys.stdout.write(color and color + s + Colors.ENDC or s)
+        if flush or STDOUT_TTY:
+            sys.stdout.flush()
     except (KeyboardInterrupt, BrokenPipeError):
         # INFO: Python flushes standard streams on exit; redirect remaining output
         #       to devnull to avoid another BrokenPipeError at shutdown.
@@ -79,8 +70,23 @@ def err(s):
     log("ERROR: " + s, Colors.ERROR)
 
 
+@functools.lru_cache(maxsize=1)
+def seconds_prefix(sec):
+    # INFO: date/time part only changes once per second; bursts of log lines reuse it.
+    lt = time.localtime(sec)
+    return f"{lt.tm_year:04d}-{lt.tm_mon:02d}-{lt.tm_mday:02d} {lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+
+
+def now_prefix():
+    # INFO: same output as datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' > ' without strftime.
+    t = time.time()
+    sec = int(t)
+    return f"{seconds_prefix(sec)}.{int((t - sec) * 1000):03d} > "
+
+
 def tlog(s, color):
-    log(datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' > ' + s, color)
+    # INFO: timestamped lines report progress (e.g. --watch saves), so they reach pipes/log files right away.
+    log(now_prefix() + s, color, flush=True)
 
 
 def tinf(s):
@@ -92,24 +98,28 @@ def terr(s):
 
 
 def twrg(s):
-    log(datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' > ' + s, Colors.WARNING)
+    tlog(s, Colors.WARNING)
 
 
 def boxed(s, title, char='-'):
     x = int((len(s) - len(title)+2) / 2)
     dx = len(s) - len(title) - 2 - x*2
-    log(x*char)
-    log(' ' + title.upper() + ' ')
-    log((x+dx)*char + '\n')
-    log(s + '\n')
-    log(len(s)*char + '\n')
+    log(x*char + ' ' + title.upper() + ' ' + (x+dx)*char + '\n' +
+        s + '\n' +
+        len(s)*char + '\n')
+
+
+_TRUE = frozenset({'true', '1', 't'})
+_FALSE = frozenset({'false', '0', 'f'})
 
 
 def str2bool(s):
     v = s.lower()
-    if v not in ['true', 'false', '1', '0', 't', 'f']:
-        raise ValueError("<%s> is not a valid value" % v)
-    return v in ['true', '1']
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    raise ValueError("<%s> is not a valid value" % v)
 
 
 HELP = """
@@ -124,7 +134,7 @@ HELP = """
 
     Operations specific arguments:
         [-m|--module MODULENAME]                    module name (mutually exclusive with --filename, -id)
-        [-id ID|XML_ID]                             record id or External Odoo ID to identify Odoo object
+        [-id ID|XML_ID]                             record id or External Odoo ID to identify Odoo object (views: comma separated list)
         [-fn|--filename FILENAME]                   searches for -id into this file
         [-sid|--source-id SOURCEID]                 looks for a specific source ID in the xml -f FILENAME (content used to update -id)
         [-w|--watch]                                activates watcher to run operation when file/s change/s
@@ -157,38 +167,116 @@ EXAMPLES = """
 
     # Refreshes all views in 'mymod' reading its location from odoo config ADDONS_PATH.
     $ vodoo update.view -d testDB -c /etc/odoo.conf -id mymod.ALL
+
+    # Refreshes 'test_view' and 'other_view' views in 'mymod' with a single query.
+    $ vodoo update.view -d testDB -c /etc/odoo.conf -id mymod.test_view,other_view
 """
 
 
-DEFAULT_CRYPT_CONTEXT = passlib and passlib.context.CryptContext(
-    # kdf which can be verified by the context. The default encryption kdf is
-    # the first of the list
-    ['pbkdf2_sha512', 'plaintext'],
-    # deprecated algorithms are still verified as usual, but ``needs_update``
-    # will indicate that the stored hash should be replaced by a more recent
-    # algorithm. Passlib 1.6 supports an `auto` value which deprecates any
-    # algorithm but the default, but Ubuntu LTS only provides 1.5 so far.
-    deprecated=['plaintext'],
-)
+class Argv:
+    # INFO: parsed command line options; a plain class with __slots__ so that vodoo keeps
+    #       running on python 3.6+ (dataclass slots and "str | None" need 3.10).
+    __slots__ = (
+        'config', 'filename', 'source_id', 'module', 'order_by', 'id', 'watch', 'value', 'user', 'password',
+        'login', 'database', 'db_user', 'db_password', 'db_host', 'clear_cache', 'odoo_host',
+    )
+
+    def __init__(self, config=None, filename=None, source_id=None, module=None, order_by=None, id=None,
+                 watch=False, value=None, user=None, password=None, login=None, database=None, db_user=None,
+                 db_password=None, db_host=None, clear_cache=False, odoo_host='http://127.0.0.1:8069'):
+        self.config = config
+        self.filename = filename
+        self.source_id = source_id
+        self.module = module
+        self.order_by = order_by
+        self.id = id
+        self.watch = watch
+        self.value = value
+        self.user = user
+        self.password = password
+        self.login = login
+        self.database = database
+        self.db_user = db_user
+        self.db_password = db_password
+        self.db_host = db_host
+        self.clear_cache = clear_cache
+        self.odoo_host = odoo_host
+
+
+# INFO: -h and -v are handled directly by the parser.
+HELP_FLAGS = frozenset(('-h', '--help'))
+VERSION_FLAGS = frozenset(('-v', '--version'))
+
+# INFO: command line flags: flag -> (Argv attribute, flag takes a value).
+FLAGS = {
+    '-c': ('config', True),
+    '--config': ('config', True),
+    '-fn': ('filename', True),
+    '--filename': ('filename', True),
+    '-sid': ('source_id', True),
+    '--source-id': ('source_id', True),
+    '-m': ('module', True),
+    '--module': ('module', True),
+    '-ob': ('order_by', True),
+    '--order-by': ('order_by', True),
+    '-id': ('id', True),
+    '-w': ('watch', False),
+    '--watch': ('watch', False),
+    '--value': ('value', True),
+    '-u': ('user', True),
+    '--user': ('user', True),
+    '-pw': ('password', True),
+    '--password': ('password', True),
+    '-d': ('database', True),
+    '-db': ('database', True),
+    '--database': ('database', True),
+    '-du': ('db_user', True),
+    '--db-user': ('db_user', True),
+    '-dp': ('db_password', True),
+    '--db-password': ('db_password', True),
+    '-dh': ('db_host', True),
+    '--db-host': ('db_host', True),
+    '-cc': ('clear_cache', False),
+    '--clear-cache': ('clear_cache', False),
+    '-oh': ('odoo_host', True),
+    '--odoo-host': ('odoo_host', True),
+}
+
+
+# INFO: rows fetched per round trip by the list commands.
+FETCH_SIZE = 2000
+
+# INFO: bound format methods, so the row templates are not looked up again for every row.
+_MODEL_ROW_FMT = "{:<20} {:<50} {:<50}  {:1}  \n".format
+_USER_ROW_FMT = "{:<10} {:<10} {:<25}\n".format
+
+
+def stream_cursor(cr, name='vodoo_stream'):
+    # INFO: named (server-side) cursor on the connection of cr; rows are fetched FETCH_SIZE at a time
+    #       instead of loading the whole result set on the client.
+    sc = cr.connection.cursor(name=name)
+    sc.itersize = FETCH_SIZE
+    return sc
 
 
 def list_model(cr, model_op, model, argv):
     model_name = model.get('model')
     model_table = model.get('table')
-    _id = argv.get('id')
-    _module = argv.get('module')
-    _order_by = argv.get('order-by') or 'model'
+    _id = argv.id
+    _module = argv.module
+    _order_by = argv.order_by or 'model'
 
     _order_by_list = _order_by.split(',')
 
-    _order_by_filtered = list(filter(lambda a: a in ['model', 'module', 'name'], _order_by_list))
+    # INFO: only whitelisted columns are interpolated into the ORDER BY clause, values are bound as parameters.
+    _order_by_columns = {'model': 'imd.model', 'module': 'imd.module', 'name': 't.name'}
+    _order_by_filtered = list(filter(lambda a: a in _order_by_columns, _order_by_list))
 
     if len(_order_by_list) != len(_order_by_filtered):
         err('Wrong --order-by clause.\n')
         return 0, 1, 0
 
-    _order_by = _order_by.replace('name', '%s.name' % model_table)
-    _order_by = _order_by.replace('model', 'ir_model_data.model')
+    _order_by = ', '.join(_order_by_columns[a] for a in _order_by_filtered)
 
     qry = """
 SELECT
@@ -202,36 +290,42 @@ FROM
     {model_table} as t
 WHERE
     {where}
-    imd.model = '{model_name}' AND
-    imd.res_id = {model_table}.id
+    imd.model = %s AND
+    imd.res_id = t.id
 ORDER BY
     {orderby}
 """
 
     # INFO: 'where' clause.
-    _where = ''
+    _where, _params = '', []
     if _id:
-        _where = "ir_model_data.name ilike '%s' AND " % _id
+        _where = "imd.name ilike %s AND "
+        _params.append(_id)
     if _module:
-        _where += "ir_model_data.module ilike '%s' AND " % _module
+        _where += "imd.module ilike %s AND "
+        _params.append(_module)
+    _params.append(model_name)
 
-    qry = qry.format(model_name=model_name, model_table=model_table, where=_where, orderby=_order_by)
-    cr.execute(qry)
-    rows = cr.fetchall()
+    qry = qry.format(model_table=model_table, where=_where, orderby=_order_by)
     log("{:<20} {:<50} {:<50} {:5}\n".format('module', 'id', 'name', 'noupd'))
     log(132*"-" + '\n')
-    for r in rows:
-        log("{:<20} {:<50} {:<50}  {:1}  \n".format(r[0][:20], r[1][:50], r[2][:50], r[4] and 'N' or ''))
-    log(f'\nTotal objects: {len(rows)} (model: {model_name})\n')
+    # INFO: rows are fetched and written FETCH_SIZE at a time, one log() call per batch.
+    nrows = 0
+    with stream_cursor(cr) as sc:
+        sc.execute(qry, _params)
+        for rows in iter(lambda: sc.fetchmany(FETCH_SIZE), []):
+            nrows += len(rows)
+            log(''.join(_MODEL_ROW_FMT(r[0][:20], r[1][:50], r[2][:50], r[4] and 'N' or '') for r in rows))
+    log(f'\nTotal objects: {nrows} (model: {model_name})\n')
     return 0, 0, 0
 
 
 def list_users(cr, model_op, model, argv):
     model_name = model.get('model')
     model_table = model.get('table')
-    _id = argv.get('id')
-    _login = argv.get('login')
-    _order_by = argv.get('order-by') or 'id'
+    _id = argv.id
+    _login = argv.login
+    _order_by = argv.order_by or 'id'
 
     _order_by_list = _order_by.split(',')
     _order_by_filtered = list(filter(lambda a: a in ['id', 'login'], _order_by_list))
@@ -252,48 +346,57 @@ ORDER BY
 """
 
     # INFO: 'where' clause.
-    _where = ''
+    _where, _params = [], []
     if _id:
-        _where = "id = %s AND " % _id
+        _where.append("id = %s")
+        _params.append(_id)
     if _login:
-        _where += "login ilike %s AND " % _login
-    if _where:
-        _where = "WHERE " + _where
+        _where.append("login ilike %s")
+        _params.append(_login)
+    _where = _where and "WHERE " + " AND ".join(_where) or ''
 
     qry = qry.format(model_table=model_table, where=_where, orderby=_order_by)
     log(qry)
 
-    cr.execute(qry)
-    rows = cr.fetchall()
     log("{:<10} {:<10} {:<25}\n".format('id', 'active', 'login'))
     log(80*"-" + '\n')
-    for r in rows:
-        log("{:<10} {:<10} {:<25}\n".format(r[0], r[1] and 'A' or '', r[2]))
-    log('\nTotal records: %d\n' % len(rows))
+    nrows = 0
+    with stream_cursor(cr) as sc:
+        sc.execute(qry, _params)
+        for rows in iter(lambda: sc.fetchmany(FETCH_SIZE), []):
+            nrows += len(rows)
+            log(''.join(_USER_ROW_FMT(r[0], r[1] and 'A' or '', r[2]) for r in rows))
+    log('\nTotal records: %d\n' % nrows)
     return 0, 0, 0
 
 
-def update_user_password(cr, model_op, model, argv):
-    if not DEFAULT_CRYPT_CONTEXT:
-        err('passlib module not found!\n')
-        return 0, 1, 0
+PBKDF2_ROUNDS = 25000
 
-    _user = argv.get('user')
-    _pw = argv.get('password')
 
-    cr.execute(
-        "SELECT id from res_users where "
-        "login = '%s'" % _user
-    )
+def ab64(b):
+    # INFO: passlib's adapted base64: no padding and '.' instead of '+'.
+    return base64.b64encode(b).rstrip(b'=').replace(b'+', b'.').decode('ascii')
+
+
+def pbkdf2_sha512(pw, rounds=PBKDF2_ROUNDS):
+    # INFO: same modular crypt format as passlib's pbkdf2_sha512 (verified by Odoo),
+    #       computed with hashlib's C implementation.
+    salt = os.urandom(16)
+    dk = hashlib.pbkdf2_hmac('sha512', pw.encode('utf-8'), salt, rounds)
+    return '$pbkdf2-sha512$%d$%s$%s' % (rounds, ab64(salt), ab64(dk))
+
+
+def update_user_password(cr, model_op, model, argv):
+    _user = argv.user
+    _pw = argv.password
+
+    cr.execute("SELECT id FROM res_users WHERE login = %s", (_user,))
     r = cr.fetchone()
     if r:
         log('Updating password for <%s>.\n' % _user)
 
         _uid = r[0]
-        ctx = DEFAULT_CRYPT_CONTEXT
-        _pw = ctx.encrypt(_pw)
-
-        assert ctx.identify(_pw) != 'plaintext'
+        _pw = pbkdf2_sha512(_pw)
 
         cr.execute('UPDATE res_users SET password = %s WHERE id = %s', (_pw, _uid))
         # TODO: trigger an invalidate cache on user model to the server.
@@ -304,16 +407,136 @@ def update_user_password(cr, model_op, model, argv):
         return 0, 1, 0
 
 
-from xml.etree import ElementTree as ET
+# INFO: lookup tables and XPath expressions are built once and reused on every call (--watch runs xml2arch on each save).
+ARCH_TAGS = {
+    'form': 'record',
+    'tree': 'record',
+    'qweb': 'template',
+}
 
 
-def xml2arch(_module, _id, ir_model_data_name, ir_ui_view_id, ir_ui_view_type, _source_id, fn):
-    nw, ne, nc = 0, 0, 0
+@functools.lru_cache(maxsize=1)
+def etree():
+    # INFO: imported on first use; lxml (libxml2) when installed, else the stdlib ElementTree.
+    try:
+        from lxml import etree as ET
+    except ImportError:
+        from xml.etree import ElementTree as ET
+    return ET
+
+
+@functools.lru_cache(maxsize=1)
+def xpath_arch_field():
+    return etree().XPath("field[@name='arch']")
+
+
+@functools.lru_cache(maxsize=32)
+def index_archs(fn, tag, stamp):
+    # INFO: streams the XML file once and maps the id of every <tag> element to its arch nodes, so
+    #       the views sharing a file (e.g. -id MODULENAME.ALL) parse it only once.
+    #       stamp (see file_stamp) is part of the cache key so that a modified file (--watch) is parsed again.
+    #       Elements without an arch are cleared so that resident memory stays around the archs.
+    ET = etree()
+    archs = {}
+
+    if not hasattr(ET, 'XPath'):
+        # INFO: stdlib fallback: no tag filter, non matching elements are skipped.
+        for _, elem in ET.iterparse(fn, events=('end',)):
+            if elem.tag != tag:
+                continue
+            arch = elem.findall("field[@name='arch']") if tag == 'record' else [elem]
+            if arch and elem.get('id'):
+                archs.setdefault(elem.get('id'), arch)
+            else:
+                elem.clear()
+        return archs
+
+    # INFO: comments and processing instructions are dropped as the stdlib parser does, so they
+    #       never count as arch children (a commented primary view must not be wrapped in <data>).
+    for _, elem in ET.iterparse(fn, events=('end',), tag=tag, huge_tree=True, collect_ids=False, remove_blank_text=False,
+                                remove_comments=True, remove_pis=True):
+        arch = xpath_arch_field()(elem) if tag == 'record' else [elem]
+        if arch and elem.get('id'):
+            archs.setdefault(elem.get('id'), arch)
+        else:
+            elem.clear()
+
+    return archs
+
+
+def file_stamp(fn):
+    # INFO: mtime alone misses writes within the filesystem time granularity and files replaced
+    #       with a preserved mtime (cp -p, rsync -t); size, inode and ctime catch those.
+    st = os.stat(fn)
+    return st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns
+
+
+def find_arch(fn, tag, rid):
+    # INFO: first <tag id="rid"> element of the XML file.
+    return index_archs(fn, tag, file_stamp(fn)).get(rid, [])
+
+
+# INFO: above this number of views update_archs stages the archs with COPY.
+COPY_THRESHOLD = 50
+
+
+def copy_text(s):
+    # INFO: escapes an arch for COPY text format.
+    return s.replace('\\', '\\\\').replace('\t', r'\t').replace('\n', r'\n').replace('\r', r'\r')
+
+
+def copy_archs(cr, archs):
+    # INFO: streams all (view id, arch) pairs into a temp table with COPY then applies them with one UPDATE ... FROM.
+    buf = io.StringIO()
+    for view_id, arch in archs:
+        buf.write('%s\t%s\n' % (view_id, copy_text(arch)))
+    buf.seek(0)
+
+    cr.execute("CREATE TEMP TABLE vodoo_upd AS SELECT id, arch_db AS value FROM ir_ui_view WITH NO DATA")
+    cr.copy_from(buf, 'vodoo_upd', columns=('id', 'value'))
+    cr.execute("UPDATE ir_ui_view SET arch_db = data.value FROM vodoo_upd AS data WHERE ir_ui_view.id = data.id")
+    cr.execute("DROP TABLE vodoo_upd")
+    return len(archs)
+
+
+def update_archs(cr, archs):
+    # INFO: writes all (view id, arch) pairs into ir_ui_view.arch_db with a single UPDATE ... FROM (VALUES ...) round-trip.
+    #       Large batches (e.g. -id MODULENAME.ALL) go through COPY instead.
+    if len(archs) > COPY_THRESHOLD:
+        return copy_archs(cr, archs)
+
+    from psycopg2.extras import execute_values
+
+    execute_values(
+        cr,
+        "UPDATE ir_ui_view SET arch_db = data.value FROM (VALUES %s) AS data(id, value) "
+        "WHERE ir_ui_view.id = data.id",
+        archs,
+        page_size=500,
+    )
+    return len(archs)
+
+
+def xml2arch(_module, _id, ir_model_data_name, ir_ui_view_type, _source_id, fn):
+    # INFO: returns the new arch read from the XML file (None on failure); the caller updates ir_ui_view.
+    nw, ne, new_arch = 0, 0, None
+    ET = etree()
+
+    tag = ARCH_TAGS.get(ir_ui_view_type)
+    if not tag:
+        twrg("WARNING: view <%s> not allowed.\n" % ir_ui_view_type)
+        nw += 1
+        return nw, ne, new_arch
+
+    # INFO: if --source-id then use it to look for that record snippet in the XML file.
+    #       if _id is % then try to match all ids from source xml.
+    rid = _source_id or ('%' not in _id and ',' not in _id and _id or ir_model_data_name)
+
     try:
         if not fn:
             raise FileNotFoundError
 
-        XML = ET.parse(fn)
+        arch = find_arch(fn, tag, rid)
 
     except FileNotFoundError:
         terr("ERROR: file not found <%s>\n" % fn)
@@ -327,23 +550,6 @@ def xml2arch(_module, _id, ir_model_data_name, ir_ui_view_id, ir_ui_view_type, _
     else:
         tinf("OK: found <%s.%s> / using file <%s>\n" % (_module, ir_model_data_name, fn))
 
-        root = XML.getroot()
-
-        # INFO: if --source-id then use it to look for that record snippet in the XML file.
-        #       if _id is % then try to match all ids from source xml.
-        rid = _source_id or ('%' not in _id and _id or ir_model_data_name)
-
-        arch = ''
-        if ir_ui_view_type in ['form', 'tree']:
-            arch = root.findall(".//record[@id='%s']/field[@name='arch']" % rid)
-        elif ir_ui_view_type in ['qweb']:
-            arch = root.findall(".//template[@id='%s']" % rid) or \
-                   root.findall(".//template[@id='%s']" % rid)
-        else:
-            twrg("WARNING: view <%s> not allowed.\n" % ir_ui_view_type)
-            nw += 1
-            return nw, ne, nc
-
         if not len(arch):
             terr("ERROR: no view found in the XML file <%s>. Maybe you need to install module in Odoo.\n" % fn)
             ne += 1
@@ -353,45 +559,208 @@ def xml2arch(_module, _id, ir_model_data_name, ir_ui_view_id, ir_ui_view_type, _
         else:
             try:
                 # INFO: builds the new arch xml to inject directly into target ir_ui_view.
-                new_arch = b''
-                for a in list(arch[0]):
-                    new_arch += ET.tostring(a)
+                node = arch[0]
 
                 # INFO: wraps around <data> if there are more than one children.
                 #       It's mandatory else odoo crashes.
-                if len(arch[0]) > 1:
-                    new_arch = b'<data>' + new_arch + b'</data>'
+                #       node belongs to the index_archs() cache so it is only read, never modified.
+                body = b''.join(ET.tostring(a, encoding='utf-8') for a in node)
+                if len(node) > 1:
+                    body = b'<data>' + body + b'</data>'
 
-                # INFO: decodes new_arch to make it compatible with postgres sql.
-                new_arch = b'<?xml version="1.0"?>\n' + new_arch
-                new_arch = new_arch.decode('utf-8').replace('"', r'\"').replace('\'', r'\'')
+                # INFO: value is bound as a query parameter so no sql escaping is needed.
+                new_arch = (b'<?xml version="1.0"?>\n' + body).decode('utf-8')
             except Exception as E:
-                terr("%sERROR: unable refreshing new data into the view: %s\n" % E)
+                terr("ERROR: unable refreshing new data into the view: %s\n" % E)
                 ne += 1
-            else:
-                try:
-                    # INFO: refreshes/injects new data into target view.
-                    cr.execute("UPDATE ir_ui_view SET arch_db = E'%s' where id = %s" %
-                               (new_arch, ir_ui_view_id))
-                    tinf("OK: updated ir.ui.view ID=%s.\n" % ir_ui_view_id)
-                    nc += 1
-                except Exception as E:
-                    terr("ERROR: exception querying postgres: %s\n" % E)
-                    ne += 1
 
-    return nw, ne, nc
+    return nw, ne, new_arch
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_path(path):
+    return path and realpath(abspath(expanduser(expandvars(path.strip())))) or ''
+
+
+@functools.lru_cache(maxsize=None)
+def list_files(path):
+    # INFO: names of the regular files in path; each directory is scanned once instead of
+    #       stat'ing every candidate file.
+    try:
+        with os.scandir(path) as entries:
+            return frozenset(e.name for e in entries if e.is_file())
+    except OSError:
+        return frozenset()
+
+
+# INFO: a directory of an addons_path entry is an odoo module when it holds one of these.
+MANIFEST_NAMES = ('__manifest__.py', '__openerp__.py')
+
+
+@functools.lru_cache(maxsize=None)
+def module_dirs(addons_path):
+    # INFO: module name -> addons_path entry holding it; the first entry wins, as in odoo.
+    #       One scandir per entry replaces a stat per view and entry.
+    dirs = {}
+    for pt in addons_path:
+        try:
+            with os.scandir(pt) as entries:
+                for e in entries:
+                    if e.name in dirs or not e.is_dir():
+                        continue
+                    if any(os.path.isfile(os.path.join(e.path, m)) for m in MANIFEST_NAMES):
+                        dirs[e.name] = pt
+        except OSError:
+            continue
+    return dirs
+
+
+@functools.lru_cache(maxsize=None)
+def find_addons_file(addons_path, arch_fs):
+    # INFO: arch_fs is stored as 'module/path/to/file.xml'; cached because views often share the same file.
+    pt = arch_fs and module_dirs(addons_path).get(arch_fs.partition('/')[0])
+    if not pt:
+        return False
+    fn = os.path.join(pt, arch_fs)
+    if os.path.basename(fn) in list_files(os.path.dirname(fn)):
+        return fn
+    return False
+
+
+class ArchWorker(threading.Thread):
+
+    def __init__(self, cr, odoo_host, delay, session):
+        super().__init__(daemon=True)
+        self.cr = cr
+        self.odoo_host = odoo_host
+        self.delay = delay
+        self.session = session
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.nerrors = 0
+        self.ncommits = 0
+
+    def run(self):
+        # INFO: single consumer: every `delay` seconds drains the handlers queued by the
+        #       watcher, parses each one once per burst and writes all archs together.
+        while not self.stopped.wait(self.delay):
+            self.drain()
+        self.drain()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def drain(self):
+        handlers = {}
+        while True:
+            try:
+                handlers[self.queue.get_nowait()] = True
+            except queue.Empty:
+                break
+
+        archs, models = [], set()
+        for h in handlers:
+            new_arch = h.refresh()
+            if new_arch:
+                archs.append((h.view_id, new_arch))
+                models.add(h.model)
+
+        if not archs:
+            return
+
+        try:
+            self.ncommits += update_archs(self.cr, archs)
+            self.cr.connection.commit()
+            tinf("OK: updated ir.ui.view ID=%s.\n" % ', '.join(str(a[0]) for a in archs))
+        except Exception as E:
+            self.cr.connection.rollback()
+            terr("ERROR: exception querying postgres: %s\n" % E)
+            self.nerrors += 1
+        else:
+            if self.session:
+                # INFO: session is only set when requests is installed.
+                import requests
+
+                # INFO: an unreachable odoo must not kill the worker, later saves would never be written.
+                for m in models:
+                    try:
+                        self.session.get(urljoin(self.odoo_host, 'clear_cache'), params={'model_name':m})
+                    except requests.RequestException as E:
+                        terr("ERROR: exception clearing odoo cache for <%s>: %s\n" % (m, E))
+                        self.nerrors += 1
+
+
+class MyHandler:
+
+    def __init__(self, worker, module, id, model, model_data_name, view_id, view_type, source_id, filename):
+        self.worker = worker
+        self.nwarnings = 0
+        self.nerrors = 0
+        self.module = module
+        self.id = id
+        self.model_data_name = model_data_name
+        self.model = model
+        self.view_id = view_id
+        self.view_type = view_type
+        self.source_id = source_id
+        self.filename = filename
+
+    def on_modified(self, event):
+        # INFO: every event is queued: editors fire several per save, but the worker refreshes
+        #       each handler once per drain, and a later save is never dropped.
+        self.worker.queue.put(self)
+
+    def refresh(self):
+        _nw, _ne, new_arch = xml2arch(
+            self.module,
+            self.id,
+            self.model_data_name,
+            self.view_type,
+            self.source_id,
+            self.filename,
+        )
+        self.nerrors += _ne
+        self.nwarnings += _nw
+        return new_arch
+
+
+@functools.lru_cache(maxsize=1)
+def get_watchdog():
+    # INFO: watchdog is imported, and DirHandler built on top of it, once and only when watching;
+    #       returns None if watchdog is not installed.
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import PatternMatchingEventHandler, FileModifiedEvent
+    except ImportError:
+        return None
+
+    class DirHandler(PatternMatchingEventHandler):
+
+        def __init__(self):
+            # INFO: watchdog drops events on non xml files and directories before dispatching them.
+            super().__init__(patterns=['*.xml'], ignore_directories=True)
+            self.handlers = collections.defaultdict(list)
+
+        def on_modified(self, event):
+            # INFO: one watch per directory, dispatching to the views of the modified file.
+            if not isinstance(event, FileModifiedEvent):
+                return
+            for h in self.handlers.get(os.path.normpath(event.src_path), ()):
+                h.on_modified(event)
+
+    return Observer, DirHandler
 
 
 def update_view(cr, model_op, model, argv):
-    _module = argv.get('module')
-    _id = argv.get('id')
-    _source_id = argv.get('source-id')
-    _filename = argv.get('filename')
-    _config = argv.get('config')
-    _value = argv.get('value')
-    _watch = argv.get('watch')
-    _clear_cache = argv.get('clear-cache')
-    _odoo_host = argv.get('odoo-host', 'http://127.0.0.1:8069')
+    _module = argv.module
+    _id = argv.id
+    _source_id = argv.source_id
+    _filename = argv.filename
+    _config = argv.config
+    _watch = argv.watch
+    _clear_cache = argv.clear_cache
+    _odoo_host = argv.odoo_host
     _arch = model_op == 'arch'
 
     if _module and not _id:
@@ -436,173 +805,135 @@ def update_view(cr, model_op, model, argv):
 
     addons_path = []
     if _config:
-        try:
-            import configparser as ConfigParser
-        except ImportError:
-            import ConfigParser
-
-        def _normalize(path):
-            return path and realpath(abspath(expanduser(expandvars(path.strip())))) or ''
-
-        config = ConfigParser.RawConfigParser()
+        config = configparser.RawConfigParser()
         try:
             config.read([_config])
-            addons_path = [_normalize(x) for x in config['options']['addons_path'].split(',')]
+            addons_path = tuple(normalize_path(x) for x in config['options']['addons_path'].split(','))
         except IOError:
             pass
-        except ConfigParser.NoSectionError:
+        # INFO: section or option lookups through config[...] raise KeyError.
+        except (KeyError, configparser.NoSectionError):
             pass
 
-    # INFO: searches for the module record id into ir_model_data.
-    cr.execute("""SELECT
-        imd.id, res_id, imd.model, type, arch_fs, imd.name, iuv.active, imd.noupdate
-    FROM
-        ir_ui_view as iuv, ir_model_data as imd
-    WHERE
-        iuv.id = imd.res_id and
-        imd.module = %s and
-        imd.model = %s and
-        imd.name ilike %s""",
-        [_module, 'ir.ui.view', _id]
-    )
-    rows = cr.fetchall()
-
     event_handlers = []
     if _watch:
-        try:
-            from watchdog.observers import Observer
-            from watchdog.observers.api import ObservedWatch
-            from watchdog.events import FileSystemEventHandler, FileModifiedEvent
-
-            class MyHandler(FileSystemEventHandler):
-
-                def __init__(self, module, id, model, model_data_name, view_id, view_type, source_id, filename):
-                    self.last_modified = datetime.now()
-                    self.nwarnings = 0
-                    self.nerrors = 0
-                    self.ncommits = 0
-                    self.module = module
-                    self.id = id
-                    self.model_data_name = model_data_name
-                    self.model = model
-                    self.view_id = view_id
-                    self.view_type = view_type
-                    self.source_id = source_id
-                    self.filename = filename
-
-                def on_modified(self, event):
-                    # if datetime.now() - self.last_modified >= timedelta(seconds=1):
-                    if (datetime.now() - self.last_modified >= timedelta(seconds=1)):
-                        if type(event) == FileModifiedEvent and \
-                                event.event_type == 'modified' and \
-                                self.filename == os.path.normpath(event.src_path):
-                            _ne, _nw, _nc = xml2arch(
-                                self.module,
-                                self.id,
-                                self.model_data_name,
-                                self.view_id,
-                                self.view_type,
-                                self.source_id,
-                                self.filename,
-                            )
-                            if self.ncommits > 0:
-                                cr.connection.commit()
-                                if _clear_cache:
-                                    requests.get(urljoin(_odoo_host, 'clear_cache'), params={'model_name':self.model})
-
-                            self.nerrors += _ne
-                            self.nwarnings += _nw
-                            self.ncommits += _nc
-
-        except ImportError:
+        session = None
+        if _clear_cache:
+            try:
+                import requests
+                from requests.adapters import HTTPAdapter
+            except ImportError:
+                err('--clear-cache requires requests library (run "pip install requests").\n')
+                return 0, 1, 0
+
+            # INFO: one keep-alive connection to odoo reused by every clear_cache call.
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        watchdog = get_watchdog()
+        if not watchdog:
             err('if you want to enable watching feature, watchdog library needs to be installed (run "pip install watchdog").\n')
             return 0, 1, 0
+        Observer, DirHandler = watchdog
 
-    # INFO: checks number of occurred errors.
-    nw, ne, nc = 0, 0, 0
-    for row in rows:
-        ir_model_data_id = row[0]
-        ir_ui_view_id = row[1]
-        ir_ui_view_model = row[2]
-        ir_ui_view_type = row[3]
-        ir_ui_view_arch_fs = row[4]
-        ir_model_data_name = row[5]
-        ir_ui_view_active = row[6]
-        ir_model_data_noupdate = row[7]
+        worker = ArchWorker(cr, _odoo_host, delay=0.25, session=session)
 
-        # INFO: updates new data into target view.
-        if model_op == 'active':
-            try:
-                log("> found: <%s.%s> / active: %s -> %s\n" % (_module, ir_model_data_name, ir_ui_view_active, str2bool(_value)))
-                cr.execute("UPDATE ir_ui_view SET active = %s where id = %s" %
-                           (str2bool(_value), ir_ui_view_id))
-                nc += 1
-            except Exception as E:
-                err("exception querying postgres: %s\n" % E)
-                ne += 1
+    # INFO: searches for the module record id into ir_model_data; -id a,b,c looks up several views at once.
+    #       rows are streamed from a server-side cursor, closed before the updates below.
+    sc = stream_cursor(cr)
+    sc.execute("""SELECT
+        iuv.id, imd.model, iuv.type, iuv.arch_fs, imd.name
+    FROM
+        ir_model_data as imd
+        JOIN ir_ui_view as iuv ON iuv.id = imd.res_id
+    WHERE
+        imd.module = %s AND
+        imd.model = 'ir.ui.view' AND
+        imd.name ilike ANY(%s)""",
+        (_module, _id.split(','))
+    )
 
-        elif model_op == 'noupdate':
-            try:
-                log("> found: <%s.%s> / noupdate: %s -> %s\n" % (_module, ir_model_data_name, ir_model_data_noupdate, str2bool(_value)))
-                cr.execute("UPDATE ir_model_data SET noupdate = %s where id = %s" %
-                           (str2bool(_value), ir_model_data_id))
-                nc += 1
-            except Exception as E:
-                err("exception querying postgres: %s\n" % E)
-                ne += 1
+    # INFO: checks number of occurred errors.
+    #       new archs are collected and written after the loop in one round-trip.
+    nw, ne, nc, nrows = 0, 0, 0, 0
+    arch_updates = []
+    for row in sc:
+        nrows += 1
+        ir_ui_view_id = row[0]
+        ir_ui_view_model = row[1]
+        ir_ui_view_type = row[2]
+        ir_ui_view_arch_fs = row[3]
+        ir_model_data_name = row[4]
 
-        # INFO: defaults to 'arch'.
+        # INFO: updates new data into target view.
+        fn = False
+        if addons_path:
+            # INFO: Tries to look for the module thru addons_path.
+            #       This is when --config has been set.
+            fn = find_addons_file(addons_path, ir_ui_view_arch_fs)
         else:
-            fn = False
-            if addons_path:
-                # INFO: Tries to look for the module thru addons_path.
-                #       This is when --config has been set.
-                for pt in addons_path:
-                    fn = os.path.join(pt, ir_ui_view_arch_fs)
-                    if os.path.exists(fn):
-                        break
-                    fn = False
-            else:
-                # INFO: if --filename option is set then use it to specify XML filename.
-                #       Second option is to use directly actual folder + ir_ui_view.arch_fs.
-                fn = _filename or ir_ui_view_arch_fs
-
-            if _watch:
-                event_handlers += [MyHandler(
-                    _module,
-                    _id,
-                    ir_ui_view_model,
-                    ir_model_data_name,
-                    ir_ui_view_id,
-                    ir_ui_view_type,
-                    _source_id,
-                    os.path.normpath(fn),
-                )]
-            else:
-                nw, ne, nc = xml2arch(_module, _id, ir_model_data_name, ir_ui_view_id, ir_ui_view_type, _source_id, fn)
+            # INFO: if --filename option is set then use it to specify XML filename.
+            #       Second option is to use directly actual folder + ir_ui_view.arch_fs.
+            fn = _filename or ir_ui_view_arch_fs
+
+        if _watch:
+            event_handlers += [MyHandler(
+                worker,
+                _module,
+                _id,
+                ir_ui_view_model,
+                ir_model_data_name,
+                ir_ui_view_id,
+                ir_ui_view_type,
+                _source_id,
+                os.path.normpath(fn),
+            )]
+        else:
+            _nw, _ne, new_arch = xml2arch(_module, _id, ir_model_data_name, ir_ui_view_type, _source_id, fn)
+            nw += _nw
+            ne += _ne
+            if new_arch:
+                arch_updates.append((ir_ui_view_id, new_arch))
+    sc.close()
+
+    # INFO: refreshes/injects new data into target records.
+    try:
+        if arch_updates:
+            nc += update_archs(cr, arch_updates)
+            tinf("OK: updated ir_ui_view.arch_db for %d record/s.\n" % len(arch_updates))
+    except Exception as E:
+        terr("ERROR: exception querying postgres: %s\n" % E)
+        ne += 1
 
-    if rows and _watch:
+    if nrows and _watch:
         if len(event_handlers) > 0:
 
             observer = Observer()
+            dir_handlers = collections.defaultdict(DirHandler)
             for e in event_handlers:
-                observer.schedule(e, path=os.path.dirname(e.filename), recursive=False)
-                # observer.add_handler_for_watch(event_handler, ObservedWatch(os.path.dirname(fn), False))
+                dir_handlers[os.path.dirname(e.filename) or '.'].handlers[e.filename].append(e)
+            for path, d in dir_handlers.items():
+                observer.schedule(d, path=path, recursive=False)
 
             observer.start()
+            worker.start()
+
+            # INFO: CTRL+C stops the observer; the main thread just blocks in join() meanwhile.
+            sigint = signal.signal(signal.SIGINT, lambda *_: observer.stop())
             try:
                 log("Press CTRL+C to interrupt the watching.\n")
-                while True:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                observer.stop()
                 observer.join()
+            finally:
+                signal.signal(signal.SIGINT, sigint)
 
-            nwarnings, nerrors, ncommits = 0, 0, 0
+            # INFO: writes the archs still waiting for the debounce window.
+            worker.stop()
+
+            nwarnings, nerrors, ncommits = 0, worker.nerrors, worker.ncommits
             for e in event_handlers:
                 nwarnings += e.nwarnings
                 nerrors += e.nerrors
-                ncommits += e.ncommits
             log('\nWarnings: %d\n' % nwarnings, color=Colors.WARNING)
             log('Errors: %d\n' % nerrors, color=Colors.ERROR)
             log('Commits: %d\n' % ncommits, color=Colors.OK)
@@ -610,7 +941,7 @@ def update_view(cr, model_op, model, argv):
             # INFO: voids nerrors and ncommits to avoid committing when returning from this call.
             nc = 0
 
-    if not rows:
+    if not nrows:
         err("ID/s not found in Odoo ir_model_data.\n")
         ne = 1
 
@@ -620,9 +951,9 @@ def update_view(cr, model_op, model, argv):
 def set_value(cr, model_op, model, argv):
     model_name = model.get('model')
     model_table = model.get('table')
-    _module = argv.get('module')
-    _id = argv.get('id')
-    value = argv.get('value')
+    _module = argv.module
+    _id = argv.id
+    value = argv.value
 
     if not _id:
         err("missing ID (-id ID|XML_ID)\n")
@@ -668,7 +999,7 @@ def set_value(cr, model_op, model, argv):
 
 
 def reset_database_trial(cr, model_op, model, argv):
-    _db = argv.get('database')
+    _db = argv.database
 
     log('Resetting trial for database <%s>.\n' % _db)
     cr.execute("DELETE FROM ir_config_parameter WHERE key = 'database.expiration_date'")
@@ -751,6 +1082,43 @@ CMDS = {
 }
 
 
+def arg2cmd(cmd):
+    # INFO: 'cmd.model.object' -> (cmd, model, object), missing parts are None.
+    c, _, rest = cmd.partition('.')
+    m, _, o = rest.partition('.')
+    return c, m or None, o or None
+
+
+def flatten_cmds(cmds, path=()):
+    # INFO: yields (cmd, model, object) keys padded with None for every command entry.
+    for name, entry in cmds.items():
+        key = path + (name,)
+        if 'call' in entry or 'alias' in entry:
+            yield key + (None,) * (3 - len(key)), entry
+        else:
+            yield from flatten_cmds(entry, key)
+
+
+def build_dispatch(cmds):
+    # INFO: flat command table with aliases already resolved to their target entry
+    #       (alias 'requires' appended to the target ones).
+    dispatch = dict(flatten_cmds(cmds))
+    for key, entry in dispatch.items():
+        if entry.get('alias'):
+            target = dispatch[arg2cmd(entry['alias'])]
+            dispatch[key] = dict(target, requires=target.get('requires', []) + entry.get('requires', []))
+    return dispatch
+
+
+# INFO: built once at import time.
+DISPATCH = build_dispatch(CMDS)
+
+
+# INFO: major and minor from odoo release.py, e.g. "version_info = (16, 0, 0, FINAL, 0, '')"
+#       or "version_info = ('saas~17', 1, 0, ...)".
+ODOO_VERSION_INFO = re.compile(r"""^version_info\s*=\s*\(\s*['"]?(?:saas~)?(\d+)['"]?\s*,\s*(\d+)""", re.M)
+
+
 # *************************************
 
 
@@ -771,11 +1139,14 @@ if __name__ == '__main__':
                 # INFO: in case odo.__path__ is not a list then we are dealing with at least with odoo 12.
                 odoo_release = os.path.join(odoo.__path__._path[0], 'odoo/release.py')
 
-            # INFO: loads release file as a script to execute. This file contains only variables assignment.
-            odoo_release_vars = {}
-            exec(open(odoo_release).read(), None, odoo_release_vars)
+            # INFO: scans release file for version_info instead of executing it.
+            with open(odoo_release) as f:
+                m = ODOO_VERSION_INFO.search(f.read())
+            if not m:
+                err("unable to read odoo version from %s.\n" % odoo_release)
+                exit(1)
 
-            odoo_version = odoo_release_vars['version']
+            odoo_version = '%s.%s' % m.groups()
 
             vn = float(odoo_version)
 
@@ -800,8 +1171,8 @@ if __name__ == '__main__':
 
     fatal = False
     arg_cmd = None
-    arg_du, arg_dp, arg_db_host, arg_db_port = None, None, '127.0.0.1', '5432'
-    argv = {}
+    arg_db_host, arg_db_port = '127.0.0.1', '5432'
+    argv = Argv()
 
     i, max_len = 0, len(args)
 
@@ -811,122 +1182,66 @@ if __name__ == '__main__':
         exit(0)
 
     while i < max_len:
+        # INFO: option flags are resolved with a single lookup, -h/-v are checked only on a miss.
+        flag = FLAGS.get(args[i])
+
+        if flag:
+            key, takes_value = flag
+            if not takes_value:
+                setattr(argv, key, True)
+            else:
+                i += 1
+                if i < max_len:
+                    setattr(argv, key, args[i])
+                else:
+                    err("missing value for argument <%s>.\n" % args[i - 1])
+                    fatal = True
+                    break
 
-        if args[i] in ['-h', '--help']:
+        elif args[i] in HELP_FLAGS:
             show_usage()
             exit(0)
 
-        elif args[i] in ['-v', '--version']:
+        elif args[i] in VERSION_FLAGS:
             show_version()
             exit(0)
 
-        elif args[i] in ['-c', '--config']:
-            i += 1
-            if i < max_len:
-                argv['config'] = args[i]
-
-        elif args[i] in ['-fn', '--filename']:
-            i += 1
-            if i < max_len:
-                argv['filename'] = args[i]
-
-        elif args[i] in ['-sid', '--source-id']:
-            i += 1
-            if i < max_len:
-                argv['source-id'] = args[i]
-
-        elif args[i] in ['-m', '--module']:
-            i += 1
-            if i < max_len:
-                argv['module'] = args[i]
-
-        elif args[i] in ['-ob', '--order-by']:
-            i += 1
-            if i < max_len:
-                argv['order-by'] = args[i]
-
-        elif args[i] in ['-id']:
-            i += 1
-            if i < max_len:
-                id = args[i].split('.')
-                if len(id) > 1:
-                    argv['module'] = id[0]
-                    _id = id[1]
-                else:
-                    _id = args[i]
-                # INFO: parses wildcard placeholders.
-                if _id == 'ALL':
-                    _id = '%'
-                else:
-                    _id = _id.replace('*', '%')
-                argv['id'] = _id
-
-        elif args[i] in ['-w', '--watch']:
-            argv['watch'] = True
-
-        elif args[i] in ['--value']:
-            i += 1
-            if i < max_len:
-                argv['value'] = args[i]
-
-        elif args[i] in ['-u', '--user']:
-            i += 1
-            if i < max_len:
-                argv['user'] = args[i]
-
-        elif args[i] in ['-pw', '--password']:
-            i += 1
-            if i < max_len:
-                argv['password'] = args[i]
-
-        elif args[i] in ['-d', '-db', '--database']:
-            i += 1
-            if i < max_len:
-                argv['database'] = args[i]
-
-        elif args[i] in ['-du', '--db-user']:
-            i += 1
-            if i < max_len:
-                arg_du = args[i]
-
-        elif args[i] in ['-dp', '--db-password']:
-            i += 1
-            if i < max_len:
-                arg_dp = args[i]
-
-
-        elif args[i] in ['-cc', '--clear-cache']:
-            argv['clear-cache'] = True
-
-        elif args[i] in ['-dh', '--db-host']:
-            i += 1
-            if i < max_len:
-                host = args[i].splt(':')
-                arg_db_host = host[0]
-                if len(host) > 1:
-                    arg_db_port = host[1]
-
-        elif args[i] in ['-oh', '--odoo-host']:
-            i += 1
-            if i < max_len:
-                argv['odoo-host'] = args[i]
-
         else:
 
             # INFO: checks if there is an unknown argument: -???.
-            if args[i][0] == '-':
+            if args[i].startswith('-'):
                 err("argument unknown <%s>.\n" % args[i])
                 fatal = True
                 break
+            elif arg_cmd:
+                err("only one operation command allowed: <%s> <%s>.\n" % (arg_cmd, args[i]))
+                fatal = True
+                break
             else:
                 # INFO: if there is no argument prefix then it's an operation command.
                 arg_cmd = args[i]
-                # arg_cmd = args[i].split('.')
-                # if len(arg_cmd) < 2:
-                #     err("syntax error in command string <%s>.\n" % args[i])
 
         i += 1
 
+    # INFO: -id MODULE.ID also sets the module; parses wildcard placeholders.
+    if argv.id:
+        module, sep, _id = argv.id.partition('.')
+        if sep:
+            argv.module = module
+        else:
+            _id = argv.id
+        if _id == 'ALL':
+            _id = '%'
+        else:
+            _id = _id.replace('*', '%')
+        argv.id = _id
+
+    # INFO: -dh HOST[:PORT], the default port is kept when PORT is missing or empty.
+    if argv.db_host:
+        host, _, port = argv.db_host.partition(':')
+        arg_db_host = host or arg_db_host
+        arg_db_port = port or arg_db_port
+
     call_operation = None
     model_op = None
     model = None
@@ -937,7 +1252,7 @@ if __name__ == '__main__':
             err("operation command not specified.\n")
             fatal = 1
 
-        elif not argv.get('database'):
+        elif not argv.database:
             err("missing --database option.\n")
             fatal = 1
 
@@ -945,27 +1260,16 @@ if __name__ == '__main__':
             # INFO: function to check needed arguments related to the model/object.
             def check_needed_args(need):
                 for a in need:
-                    if a not in argv:
+                    if getattr(argv, a) is None:
                         err('Missing argument <--%s>.\n' % a)
                         return True
                 return False
 
-            def arg2cmd(cmd):
-                cmds = cmd.split('.')
-                return cmds[0], (len(cmds) > 1) and cmds[1] or None, (len(cmds) > 2) and cmds[2] or None
-
             cmd, cmd_model, cmd_object = arg2cmd(arg_cmd)
-            model = CMDS.get(cmd, {}).get(cmd_model, {})
-            model = model.get(cmd_object, model)
+            model = DISPATCH.get((cmd, cmd_model, cmd_object))
             model_op = cmd_object or cmd_model
 
-            if isinstance(model, dict):
-                if model.get('alias'):
-                    cmd, cmd_model, cmd_object = arg2cmd(model.get('alias'))
-                    alias_model = CMDS.get(cmd, {}).get(cmd_model, {})
-                    alias_model.get("requires", []).extend(model.get("requires"))
-                    model = alias_model
-
+            if model:
                 call_operation = model.get('call')
                 fatal = model.get('requires') and check_needed_args(model.get('requires'))
 
@@ -988,8 +1292,11 @@ if __name__ == '__main__':
             exit(1)
 
         try:
-            conn = psycopg2.connect("dbname='%s' user='%s' host='%s' port='%s' password='%s'" %
-                                    (argv['database'], arg_du or 'odoo', arg_db_host, arg_db_port, arg_dp))
+            # INFO: connection parameters are quoted by psycopg2 (None ones are left out).
+            #       tcp keepalives keep long --watch sessions from being dropped by idle timeouts.
+            conn = psycopg2.connect(dbname=argv.database, user=argv.db_user or 'odoo', host=arg_db_host,
+                                    port=arg_db_port, password=argv.db_password,
+                                    keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=5)
             cr = conn.cursor()
             try:
                 nwarings, nerrors, ncommits = call_operation(cr, model_op, model, argv)
@@ -1013,8 +1320,10 @@ if __name__ == '__main__':
                         conn.commit()
                     else:
                         log("\nChanges aborted!\n")
-
-                    cr.close()
+            finally:
+                # INFO: every change of the operation is in one transaction; closing without
+                #       commit (errors, exception, aborted confirmation) rolls all of it back.
+                conn.close()
         except Exception as E:
             err("exception when connecting to the database: %s\n" % E)
 